@@ -5,6 +5,7 @@
 
 """Module for build steps and other callable actions, that can be defined in a modular way."""
 from logging import getLogger
+from os import environ
 from typing import Any, Callable, List, Union
 
 from ahjo.context import Context
@@ -16,6 +17,10 @@ logger = getLogger('ahjo')
 # dict containing information of all defined actions
 # action register makes it possible to handle user-defined actions
 registered_actions = {}
+# incremented whenever an action is registered, invalidates _actions_sorted_cache
+_registeration_version = 0
+# (registered actions dict, registeration version, sorted (name, description) pairs) of the last listing
+_actions_sorted_cache = None
 
 
 def action(name: str = None, affects_database: bool = False, dependencies: List[str] = []) -> Callable[[Context, Any], Any]:
@@ -53,22 +58,36 @@ class ActionRegisteration:
         self.affects_database = affects_database
         self.dependencies = set(dependencies)
         self.baseactions = baseactions if baseactions is not None else {name}
+        self.description = function.__doc__ or 'No description available.'
         self.register()
 
     def register(self):
         """Adds self to a global dictionary of all actions."""
-        global registered_actions
+        global registered_actions, _registeration_version
         registered_actions[self.name] = self
+        _registeration_version += 1
 
     def pre_exec_check(self, context: Context) -> bool:
         """Prints dependencies and asks permission for database operations.
         Called before action execution.
+
+        Permission is not asked if environment variable AHJO_ASSUME_YES
+        or AHJO_ASSUME_NO is set to '1'. AHJO_ASSUME_NO takes precedence.
         """
         self.notify_dependencies()
         if self.affects_database is True:
             conn_info = context.get_conn_info()
             warning_message = f"Warning! You are about to commit changes to server " \
                 f"{conn_info.get('server')} database {conn_info.get('database')}"
+            # confirmation can be given beforehand, f.e. in automated pipelines
+            if environ.get('AHJO_ASSUME_NO') == '1':
+                logger.info(warning_message)
+                logger.info('cancelled (AHJO_ASSUME_NO)')
+                return False
+            if environ.get('AHJO_ASSUME_YES') == '1':
+                logger.info(warning_message)
+                logger.info('confirmed (AHJO_ASSUME_YES)')
+                return True
             if not are_you_sure(warning_message):
                 return False
         return True
@@ -105,15 +124,16 @@ def create_multiaction(action_name: str, subactions: List[str], description: str
         The combination of subaction functions.
     """
     registerations = [registered_actions[sa] for sa in subactions]
-    affects_database = any([r.affects_database for r in registerations])
+    affects_database = any(r.affects_database for r in registerations)
     baseactions = {
         baseaction for r in registerations for baseaction in r.baseactions}
     dependencies = {
         dep for r in registerations for dep in r.dependencies} - baseactions
 
+    functions = tuple(r.function for r in registerations)
+
     def func(*args, **kwargs):
-        returns = [r.function(*args, **kwargs) for r in registerations]
-        return returns
+        return [function(*args, **kwargs) for function in functions]
     func.__doc__ = description
     ActionRegisteration(func, action_name, affects_database,
                         dependencies, baseactions)
@@ -134,7 +154,10 @@ def check_action_validity(action_name: str, allowed_actions: Union[str, list]) -
     bool
         Is the action valid or not?
     """
-    if action_name not in allowed_actions and 'ALL' not in allowed_actions:
+    if isinstance(allowed_actions, str):
+        allowed_actions = [allowed_actions]
+    allowed_set = frozenset(allowed_actions)
+    if action_name not in allowed_set and 'ALL' not in allowed_set:
         logger.error("Action " + action_name +
                      " is not permitted, allowed actions: " + ', '.join(allowed_actions))
         return False
@@ -176,9 +199,14 @@ def execute_action(action_name: str, config_filename: str, *args, **kwargs):
 
 
 def list_actions():
+    global _actions_sorted_cache
+    if (_actions_sorted_cache is None
+            or _actions_sorted_cache[0] is not registered_actions
+            or _actions_sorted_cache[1] != _registeration_version):
+        _actions_sorted_cache = (registered_actions, _registeration_version, tuple(
+            (key, registeration.description) for key, registeration in sorted(registered_actions.items())))
     logger.info('-------------------------------')
     logger.info('List of available actions')
     logger.info('-------------------------------')
-    for key, registeration in sorted(registered_actions.items()):
-        logger.info(
-            f"'{key}': {registeration.function.__doc__ or 'No description available.'}")
+    for key, description in _actions_sorted_cache[2]:
+        logger.info(f"'{key}': {description}")
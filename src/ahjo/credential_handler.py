@@ -5,31 +5,129 @@
 
 """Password information handling."""
 import getpass
-from base64 import b64decode, b64encode
+import os
+import threading
 from logging import getLogger
 from pathlib import Path
-from typing import Tuple, Union
+from tempfile import mkstemp
+from typing import Dict, Iterable, Tuple, Union
 
-logger = getLogger('ahjo')
+try:
+    import pybase64 as _b64
+except ImportError:
+    import base64 as _b64
+
+try:
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives.ciphers.aead import ChaCha20Poly1305
+except ImportError:
+    ChaCha20Poly1305 = None
 
+logger = getLogger('ahjo')
 
-def obfuscate_credentials(credentials: Tuple[str, str]) -> Tuple[str, str]:
-    """Not secure encryption of credentials.
-    At least it is not in plain text.
+# prefix of passwords encrypted with ChaCha20-Poly1305, other passwords are base64 encoded
+ENCRYPTED_PREFIX = 'chacha20poly1305:'
+# file holding the user's encryption key, created when first needed
+# if None, ~/.ahjo/key is used - home directory is resolved only when the key is needed
+KEY_FILE = None
+KEY_LENGTH = 32
+
+# parsed key-value files: absolute path -> (modification stamp, key-value pairs)
+_file_cache = {}
+_key = None
+# deobfuscated credentials: credential key -> (username, password)
+_cred_dict = {}
+_cred_lock = threading.Lock()
+
+
+def obfuscate_credentials(credentials: Tuple[str, str], encrypt: bool = False) -> Tuple[str, str]:
+    """Base64 encode password. At least it is not in plain text.
+    If encrypt is True, password is encrypted with ChaCha20-Poly1305
+    using the user's key in ~/.ahjo/key, which requires package cryptography.
     """
     username, password = credentials
-    obfuscated_password = b64encode(password.encode()).decode()
+    if not encrypt:
+        obfuscated_password = _b64.b64encode(password.encode()).decode()
+    elif ChaCha20Poly1305 is None:
+        raise RuntimeError(
+            "Password encryption requires package cryptography. Install Ahjo with tag encryption.")
+    else:
+        nonce = os.urandom(12)
+        encrypted = ChaCha20Poly1305(_get_key()).encrypt(nonce, password.encode(), None)
+        obfuscated_password = ENCRYPTED_PREFIX + _b64.b64encode(nonce + encrypted).decode()
     return username, obfuscated_password
 
 
 def deobfuscate_credentials(credentials: Tuple[str, str]) -> Tuple[str, str]:
     """Reverse of obfuscate_credentials.
+    Base64 encoded passwords are decoded, encrypted passwords are decrypted.
     """
     username, obfuscated_password = credentials
-    password = b64decode(obfuscated_password.encode()).decode()
+    obfuscated_password = obfuscated_password.strip()
+    if not obfuscated_password.startswith(ENCRYPTED_PREFIX):
+        password = _b64.b64decode(obfuscated_password, validate=True).decode()
+        return username, password
+    if ChaCha20Poly1305 is None:
+        raise RuntimeError(
+            "Password is encrypted. Install package cryptography to decrypt it.")
+    data = _b64.b64decode(obfuscated_password[len(ENCRYPTED_PREFIX):], validate=True)
+    try:
+        password = ChaCha20Poly1305(_get_key()).decrypt(data[:12], data[12:], None).decode()
+    except InvalidTag as err:
+        raise ValueError(
+            f"Could not decrypt password. Password was not encrypted with the key in {_key_file_path()}.") from err
     return username, password
 
 
+def _get_key() -> bytes:
+    """Return the user's encryption key.
+    If key file does not exist, create it with a new random key, readable only by the user.
+    """
+    global _key
+    if _key is None:
+        key_file = _key_file_path()
+        if not key_file.is_file():
+            _create_key_file(key_file)
+        key = key_file.read_bytes()
+        if len(key) != KEY_LENGTH:
+            raise ValueError(
+                f"Encryption key file {key_file} is corrupted, expected a {KEY_LENGTH} byte key. "
+                "Remove the file and store the passwords again.")
+        _key = key
+    return _key
+
+
+def _key_file_path() -> Path:
+    """Return KEY_FILE or the default key file in the user's home directory."""
+    if KEY_FILE is not None:
+        return Path(KEY_FILE)
+    return Path.home() / '.ahjo' / 'key'
+
+
+def _create_key_file(key_file: Path):
+    """Write a new random key to a temporary file readable only by the user
+    and move it to key_file, so that the key file is never seen partially written.
+    If another process created the key file first, its key is kept.
+    """
+    key_file.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = mkstemp(prefix='key.', suffix='.tmp', dir=str(key_file.parent))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(ChaCha20Poly1305.generate_key())
+        try:
+            # unlike os.replace, a hard link never overwrites an existing key
+            os.link(tmp_path, str(key_file))
+        except FileExistsError:
+            return
+        except OSError:
+            # file system does not support hard links
+            os.replace(tmp_path, str(key_file))
+        logger.info(f"Created encryption key file {key_file}")
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
 def lookup_from_file(key: str, filename: str) -> Union[str, None]:
     """Return value from file.
 
@@ -37,30 +135,64 @@ def lookup_from_file(key: str, filename: str) -> Union[str, None]:
     """
     if not Path(filename).is_file():
         return None
-    with open(filename, "r") as f:
-        for line in f:
-            try:
-                linekey, val = line.split('=', 1)
-                if linekey == key:
-                    return val
-            except:
-                return ""
-    return None
+    return _read_key_value_file(filename).get(key)
+
+
+def _read_key_value_file(filename: str) -> Dict[str, str]:
+    """Return key and value pairs of file as dictionary.
+    The file is parsed again only if it has been modified since the last read.
+    """
+    file_path = Path(filename).absolute()
+    file_stat = file_path.stat()
+    stamp = (file_stat.st_mtime_ns, file_stat.st_size)
+    cached = _file_cache.get(str(file_path))
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    values = {}
+    for line in file_path.read_text().splitlines():
+        if '=' in line:
+            linekey, val = line.split('=', 1)
+            values.setdefault(linekey, val)
+    _file_cache[str(file_path)] = (stamp, values)
+    return values
 
 
 def store_to_file(key: str, val: str, filename: str):
-    """Write key and value pairs to file.
+    """Write key and value pair to file.
+    If file directory does not exists, create directory before writing.
+    """
+    store_many_to_file([(key, val)], filename)
+
+
+def store_many_to_file(pairs: Iterable[Tuple[str, str]], filename: str):
+    """Write key and value pairs to file, one pair per line.
+    The file is opened once and all the lines are written in a single buffered write.
     If file directory does not exists, create directory before writing.
+    If existing file does not end with a newline (written by older versions), add it first.
     """
     if not Path(filename).parent.exists():
         Path(filename).parent.mkdir(parents=True, exist_ok=True)
-    with open(filename, "a+") as f:
-        f.writelines(str(key)+'='+str(val))
+    lines = ''.join(f"{key}={val}\n" for key, val in pairs)
+    if _lacks_trailing_newline(filename):
+        lines = '\n' + lines
+    with open(filename, "a", buffering=65536) as f:
+        f.write(lines)
+    _file_cache.pop(str(Path(filename).absolute()), None)
 
 
-def get_credentials(usrn_file_path: str = None, pw_file_path: str = None, cred_key: str = 'cred', usrn_prompt: str = "Username: ", pw_prompt: str = "Password: ") -> Tuple[str, str]:
+def _lacks_trailing_newline(filename: str) -> bool:
+    """Return True if file exists, is not empty and its last character is not a newline."""
+    if not Path(filename).is_file() or Path(filename).stat().st_size == 0:
+        return False
+    with open(filename, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b'\n'
+
+
+def get_credentials(usrn_file_path: str = None, pw_file_path: str = None, cred_key: str = 'cred', usrn_prompt: str = "Username: ", pw_prompt: str = "Password: ", encrypt: bool = False) -> Tuple[str, str]:
     """Retrieves credentials or asks for them.
-    The credentials are stored in a global variable.
+    The deobfuscated credentials are stored in a global variable,
+    so they are decoded only once per credential key.
 
     Arguments
     ---------
@@ -76,18 +208,20 @@ def get_credentials(usrn_file_path: str = None, pw_file_path: str = None, cred_k
     pw_prompt
         How the password is asked.
         If None, password is not asked from user.
+    encrypt
+        Indicator to encrypt the password stored to pw_file_path instead of base64 encoding it.
 
     Returns
     -------
     Tuple[str, str]
         The username and the password in a tuple.
     """
-    global cred_dict
-
-    if 'cred_dict' not in globals():
-        cred_dict = {}
-
-    if cred_key not in cred_dict:
+    credentials = _cred_dict.get(cred_key)
+    if credentials is not None:
+        return credentials
+    with _cred_lock:
+        if cred_key in _cred_dict:
+            return _cred_dict[cred_key]
         if usrn_file_path is not None and pw_file_path is not None:
             username = lookup_from_file(cred_key, usrn_file_path)
             password = lookup_from_file(cred_key, pw_file_path)
@@ -100,13 +234,13 @@ def get_credentials(usrn_file_path: str = None, pw_file_path: str = None, cred_k
                 username = input(usrn_prompt)
                 new_password = getpass.getpass(pw_prompt) if pw_prompt else ''
                 username, password = obfuscate_credentials(
-                    (username, new_password))
+                    (username, new_password), encrypt=encrypt)
                 store_to_file(cred_key, username, usrn_file_path)
                 store_to_file(cred_key, password, pw_file_path)
+            _cred_dict[cred_key] = deobfuscate_credentials((username, password))
         else:
+            # credentials are not stored, so there is nothing to obfuscate
             username = input(usrn_prompt)
             new_password = getpass.getpass(pw_prompt) if pw_prompt else ''
-            username, password = obfuscate_credentials(
-                (username, new_password))
-        cred_dict[cred_key] = (username, password)
-    return deobfuscate_credentials(cred_dict[cred_key])
+            _cred_dict[cred_key] = (username, new_password)
+        return _cred_dict[cred_key]
@@ -33,16 +33,19 @@ def create_conn_info(conf: dict) -> dict:
     azure_auth = conf.get('azure_authentication')
     username_file = conf.get("username_file")
     password_file = conf.get("password_file")
+    encrypt_password_file = conf.get("encrypt_password_file", False)
     if azure_auth in ('ActiveDirectoryIntegrated', 'ActiveDirectoryInteractive'):
         username, password = get_credentials(
             usrn_file_path=username_file,
             pw_file_path=password_file,
-            pw_prompt=None    # do not ask for password
+            pw_prompt=None,    # do not ask for password
+            encrypt=encrypt_password_file
         )
     else:
         username, password = get_credentials(
             usrn_file_path=username_file,
-            pw_file_path=password_file
+            pw_file_path=password_file,
+            encrypt=encrypt_password_file
         )
     return {
         'host': host,
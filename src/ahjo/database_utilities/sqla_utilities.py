@@ -5,17 +5,20 @@
 
 """Utility functions for sqlalchemy
 """
-from re import DOTALL
-from typing import Iterable, List, Union
+from codecs import BOM_UTF16_BE, BOM_UTF16_LE, BOM_UTF32_BE, BOM_UTF32_LE
+from functools import lru_cache
+from re import DOTALL, compile as re_compile, escape
+from typing import Iterable, List, Tuple, Union
 
-from pyparsing import (Combine, LineStart, Literal, QuotedString, Regex,
-                       restOfLine)
+from pyparsing import (Combine, LineStart, Literal, ParserElement,
+                       QuotedString, Regex, restOfLine)
 from sqlalchemy import create_engine, inspect
 from sqlalchemy.engine import Engine
 from sqlalchemy.engine.url import URL
 from sqlalchemy.sql import text
 
 MASTER_DB = {'mssql+pyodbc': 'master', 'postgresql': 'postgres'}
+UTF_16_32_BOMS = (BOM_UTF32_LE, BOM_UTF32_BE, BOM_UTF16_LE, BOM_UTF16_BE)
 
 
 def create_sqlalchemy_url(conn_info: dict, use_master_db: bool = False) -> URL:
@@ -159,7 +162,7 @@ def execute_try_catch(engine: Engine, query: str, variables: Union[list, tuple]
                 raise
 
 
-def execute_from_file(engine: Engine, file_path: str, scripting_variables: dict = None, include_headers: bool = False) -> List[Iterable]:
+def execute_from_file(engine: Engine, file_path: str, scripting_variables: dict = None, include_headers: bool = False, file_content: bytes = None) -> List[Iterable]:
     """Open file containing raw SQL and execute in batches.
     File is must be UTF-8 or UTF-8 with BOM.
 
@@ -179,17 +182,27 @@ def execute_from_file(engine: Engine, file_path: str, scripting_variables: dict
         Therefore scripting variables can be utilized in SQL injection attack. USE CAREFULLY!
     include_headers
         Indicator to add result headers to first returned row.
+    file_content
+        Content of the file, if already read. If not given, the file is read from file_path.
 
     Returns
     -------
     list
         Query output as list. If query returns no output, empty list is returned.
     """
+    if file_content is None:
+        with open(file_path, 'rb', buffering=65536) as f:
+            head = f.read(4)
+            _check_not_utf_16_or_32(head, file_path)
+            file_content = head + f.read()
+    else:
+        _check_not_utf_16_or_32(file_content, file_path)
     try:
-        with open(file_path, 'r', encoding='utf-8-sig', errors='strict') as f:
-            sql = f.read()
+        sql = file_content.decode('utf-8-sig', errors='strict')
     except ValueError as err:
         raise ValueError(f'File {file_path} is not UTF-8 or UTF-8 BOM encoded!') from err
+    # universal newlines, as when file is read in text mode
+    sql = sql.replace('\r\n', '\n').replace('\r', '\n')
     dialect = get_dialect_patterns(engine.name)
     if scripting_variables:
         sql = _insert_script_variables(dialect, sql, scripting_variables)
@@ -208,13 +221,26 @@ def execute_from_file(engine: Engine, file_path: str, scripting_variables: dict
     return script_output
 
 
+def _check_not_utf_16_or_32(file_head: bytes, file_path: str):
+    """Raise error if file starts with UTF-16 or UTF-32 byte order mark,
+    before the whole file is read and decoded."""
+    if file_head.startswith(UTF_16_32_BOMS):
+        raise ValueError(f'File {file_path} is not UTF-8 or UTF-8 BOM encoded!')
+
+
 def _insert_script_variables(dialect_patterns: dict, sql: str, scripting_variables: dict):
     """Insert scripting variables into SQL,
-    use pattern according to dialect."""
-    for variable_name, variable_value in scripting_variables.items():
-        pattern = dialect_patterns.get('script_variable_pattern', '{}')
-        sql = sql.replace(pattern.format(variable_name), variable_value)
-    return sql
+    use pattern according to dialect.
+    All variables are replaced in a single pass over SQL,
+    longer placeholders are preferred over their prefixes."""
+    variables = scripting_variables.items()
+    if not variables:
+        return sql
+    pattern = dialect_patterns.get('script_variable_pattern', '{}')
+    values = {pattern.format(name): value for name, value in variables}
+    placeholders = sorted(values, key=len, reverse=True)
+    placeholder_regex = re_compile('|'.join(escape(p) for p in placeholders))
+    return placeholder_regex.sub(lambda match: values[match.group(0)], sql)
 
 
 def _split_to_batches(dialect_patterns: dict, sql: str) -> List[str]:
@@ -223,37 +249,47 @@ def _split_to_batches(dialect_patterns: dict, sql: str) -> List[str]:
     If no batch separator given or no batch separator instance
     found in SQL, do not split SQL.
     """
+    # if no dialect patterns or no batch separator given, return
+    if not dialect_patterns:
+        return [sql]
     batch_separator = dialect_patterns.get('batch_separator')
+    if not batch_separator:
+        return [sql]
     one_line_comment = dialect_patterns.get('one_line_comment')
     multiline_comment = dialect_patterns.get('multiline_comment')
     quoted_strings = dialect_patterns.get('quoted_strings')
-    # if no batch separator given, return
-    if not batch_separator:
-        return [sql]
     # look for batch separators while ignoring comments and literals
-    sql_batch = batch_separator
+    sql_batch = _get_batch_scanner(batch_separator, one_line_comment,
+                                   multiline_comment, tuple(quoted_strings))
+
+    # Pyparsing implicitly calls str.expandtabs before running its parse/scan methods
+    sql = sql.expandtabs()
+    # batch bounds are collected in one scan: batch start, separator start, separator end, ...
+    bounds = [0]
+    for _, start, end in sql_batch.scanString(sql):
+        bounds.extend((start, end))
+    # if no batch separator instance found in SQL, return
+    if len(bounds) == 1:
+        return [sql]
+    bounds.append(len(sql))
+    pairs = iter(bounds)
+    return [sql[start:end] for start, end in zip(pairs, pairs)]
+
+
+@lru_cache(maxsize=8)
+def _get_batch_scanner(batch_separator: ParserElement, one_line_comment: ParserElement,
+                       multiline_comment: ParserElement, quoted_strings: Tuple[ParserElement, ...]) -> ParserElement:
+    """Return copy of batch separator, that ignores comments and literals.
+    The dialect patterns are shared, so the batch separator itself is not modified.
+    """
+    sql_batch = batch_separator.copy()
     if one_line_comment:
         sql_batch.ignore(one_line_comment)
     if multiline_comment:
         sql_batch.ignore(multiline_comment)
     for quote_str in quoted_strings:
         sql_batch.ignore(quote_str)
-
-    # Pyparsing implicitly calls str.expandtabs before running its parse/scan methods
-    sql = sql.expandtabs()
-    found_separators = sql_batch.scanString(sql)
-    sep_indexes = [(start, end) for _, start, end in found_separators]
-    # if no batch separator instance found in SQL, return
-    if not sep_indexes:
-        return [sql]
-    batches = []
-    for i, _ in enumerate(sep_indexes):
-        if i == 0:
-            batches.append(sql[:sep_indexes[i][0]])
-        else:
-            batches.append(sql[sep_indexes[i-1][1]:sep_indexes[i][0]])
-    batches.append(sql[sep_indexes[-1][1]:])
-    return batches
+    return sql_batch
 
 
 def get_schema_names(engine: Engine) -> List[str]:
@@ -263,11 +299,14 @@ def get_schema_names(engine: Engine) -> List[str]:
     return db_list
 
 
+@lru_cache(maxsize=4)
 def get_dialect_patterns(dialect_name: str) -> dict:
     """Return dialect patterns (used in SQL parsing), given dialect name.
     If dialect name not recorded, return empty dictionary.
+
+    The patterns are created once per dialect and shared by all callers.
+    Do not modify the returned dictionary or the patterns in it.
     """
-    # Notice, that if DIALECT_PATTERS is a global variable, pyparsing slows down remarkably.
     DIALECT_PATTERNS = {
         'mssql': {
             'quoted_strings': [    # depends on how QUOTED_IDENTIFIER is set
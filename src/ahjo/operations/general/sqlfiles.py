@@ -5,11 +5,13 @@
 
 """Module for SQL script file deploy and drop."""
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from logging import getLogger
-from os import listdir, path
+from os import path, scandir
 from pathlib import Path
-from traceback import format_exc
-from typing import Any, Callable
+from re import IGNORECASE, compile as re_compile
+from traceback import format_exc, format_exception
+from typing import Any, Callable, Dict, List
 
 from ahjo.database_utilities import execute_from_file, execute_try_catch
 from ahjo.interface_methods import format_to_table
@@ -18,10 +20,21 @@ from sqlalchemy.engine import Engine
 
 logger = getLogger('ahjo')
 
+# Patterns for finding the objects created and referenced in SQL script files.
+# Used only for ordering the files, so false matches (f.e. in comments) are harmless.
+CREATE_PATTERN = re_compile(
+    r'CREATE\s+(?:OR\s+ALTER\s+)?(?:PROC(?:EDURE)?|VIEW|FUNCTION|TABLE)\s+\[?(\w+)\]?\s*\.\s*\[?(\w+)\]?',
+    IGNORECASE)
+REFERENCE_PATTERN = re_compile(r'\[?(\w+)\]?\s*\.\s*\[?(\w+)\]?')
 
-def deploy_sqlfiles(engine: Engine, directory: str, message: str, display_output: bool = False, scripting_variables: dict = None) -> bool:
+
+def deploy_sqlfiles(engine: Engine, directory: str, message: str, display_output: bool = False, scripting_variables: dict = None, max_workers: int = 1) -> bool:
     """Run every SQL script file found in given directory and print the executed file names.
 
+    The files are run in order of the objects they create and reference. Files that still
+    fail, f.e. because of dependencies not recognized from the scripts, are retried.
+    If max_workers is greater than one, the files that do not depend on each other are
+    run concurrently, each in its own connection.
     If any file in directory cannot be deployed after multiple tries, raise an exeption and
     list failed files to user.
 
@@ -37,6 +50,9 @@ def deploy_sqlfiles(engine: Engine, directory: str, message: str, display_output
         Indicator to print script output.
     variables
         Variables passed to SQL script.
+    max_workers
+        Maximum number of files run concurrently.
+        Should not exceed the connection pool size of the engine.
 
     Raises
     ------
@@ -52,14 +68,22 @@ def deploy_sqlfiles(engine: Engine, directory: str, message: str, display_output
         if not Path(directory).is_dir():
             logger.warning("Directory not found: " + directory)
             return False
-        files = [path.join(directory, f)
-                 for f in listdir(directory) if f.endswith('.sql')]
-        failed = sql_file_loop(deploy_sql_from_file, engine,
-                               display_output, scripting_variables, file_list=files, max_loop=len(files))
+        files = list_sql_files(directory)
+        # files are read once, retries are executed from memory
+        file_contents = read_sql_files(files)
+        sql_by_file = {f: file_contents[f].decode('utf-8-sig', errors='replace') if f in file_contents else ''
+                       for f in files}
+        levels = dependency_levels(sql_by_file)
+        if max_workers > 1:
+            files = parallel_file_loop(deploy_sql_from_file, engine, display_output, scripting_variables,
+                                       file_contents, levels=levels, max_workers=max_workers)
+        else:
+            files = [f for level in levels for f in level]
+        failed = sql_file_loop(deploy_sql_from_file, engine, display_output, scripting_variables,
+                               file_contents, file_list=files, max_loop=len(files))
         if len(failed) > 0:
-            error_msg = "Failed to deploy the following files:\n{}".format(
-                '\n'.join(failed.keys()))
-            error_msg = error_msg + '\nSee log for error details.'
+            error_msg = '\n'.join(
+                ["Failed to deploy the following files:", *failed.keys(), "See log for error details."])
             for fail_object, fail_messages in failed.items():
                 logger.debug(f'----- Error for object {fail_object} -----')
                 logger.debug(''.join(fail_messages))
@@ -86,25 +110,40 @@ def drop_sqlfile_objects(engine: Engine, object_type: str, directory: str, messa
     Raises
     ------
     RuntimeError
-        If any of the files in given directory fail to drop after multiple tries.
+        If any of the files in given directory is not named in <schema.object.sql> format,
+        or if any of the files fail to drop after multiple tries.
     """
     with OperationManager(message):
         if not Path(directory).is_dir():
             logger.warning("Directory not found: " + directory)
             return
-        files = [path.join(directory, f)
-                 for f in listdir(directory) if f.endswith('.sql')]
-        failed = sql_file_loop(drop_sql_from_file, engine,
-                               object_type, file_list=files, max_loop=len(files))
+        files = list_sql_files(directory)
+        # file names are parsed and validated before any objects are dropped
+        drop_queries = {f: f"DROP {object_type} {object_name_from_file(f, object_type)}" for f in files}
+        failed = sql_file_loop(execute_drop_query, engine, drop_queries,
+                               file_list=files, max_loop=len(files))
         if len(failed) > 0:
-            error_msg = "Failed to drop the following files:\n{}".format(
-                '\n'.join(failed.keys()))
+            error_parts = ["Failed to drop the following files:", *failed.keys()]
             for fail_messages in failed.values():
-                error_msg = error_msg + ''.join(fail_messages)
-            raise RuntimeError(error_msg)
+                error_parts.extend(fail_messages)
+            raise RuntimeError('\n'.join(error_parts))
+
+
+def read_sql_files(files: List[str]) -> Dict[str, bytes]:
+    """Return contents of SQL script files by file path.
+    Files that can not be read are left out. They are read again
+    when deployed, so that the error is reported with the other failures.
+    """
+    file_contents = {}
+    for file in files:
+        try:
+            file_contents[file] = Path(file).read_bytes()
+        except OSError:
+            logger.debug(f"Could not read file {file} before deployment")
+    return file_contents
 
 
-def deploy_sql_from_file(file: str, engine: Engine, display_output: bool, scripting_variables: dict):
+def deploy_sql_from_file(file: str, engine: Engine, display_output: bool, scripting_variables: dict, file_contents: Dict[str, bytes] = None):
     '''Run single SQL script file.
 
     Print output as formatted table.
@@ -119,12 +158,16 @@ def deploy_sql_from_file(file: str, engine: Engine, display_output: bool, script
         Indicator to print script output.
     variables
         Variables passed to SQL script.
+    file_contents
+        Already read contents of SQL script files by file path.
+        If file is not found, it is read from disk.
     '''
     output = execute_from_file(
         engine,
         file_path=file,
         scripting_variables=scripting_variables,
-        include_headers=True
+        include_headers=True,
+        file_content=file_contents.get(file) if file_contents is not None else None
     )
     logger.info(path.basename(file))
     if display_output:
@@ -135,6 +178,7 @@ def drop_sql_from_file(file: str, engine: Engine, object_type: str):
     '''Run DROP OBJECT command for object in SQL script file.
 
     The drop command is based on object type and file name.
+    Not used by drop_sqlfile_objects anymore, kept for backward compatibility.
 
     Parameters
     ----------
@@ -145,25 +189,129 @@ def drop_sql_from_file(file: str, engine: Engine, object_type: str):
     object_type
         Type of database object.
     '''
+    object_name = object_name_from_file(file, object_type)
+    execute_try_catch(engine, query=f"DROP {object_type} {object_name}")
+
+
+def execute_drop_query(file: str, engine: Engine, drop_queries: Dict[str, str]):
+    '''Run DROP OBJECT command prepared for object in SQL script file.
+
+    Parameters
+    ----------
+    file
+        SQL script file path.
+    engine
+        SQL Alchemy engine.
+    drop_queries
+        Drop commands by file path.
+    '''
+    execute_try_catch(engine, query=drop_queries[file])
+
+
+def object_name_from_file(file: str, object_type: str) -> str:
+    '''Return name of the object created in SQL script file, based on file name.
+
+    Raises
+    ------
+    RuntimeError
+        If file is not named in <schema.object.sql> format.
+    '''
     parts = path.basename(file).split('.')
     # SQL files are assumed to be named in format: schema.object.sql
     # The only exception is assemblies. Assemblies don't have schema.
     if object_type == 'ASSEMBLY':
-        object_name = parts[0]
-    else:
-        if len(parts) != 3:
-            raise RuntimeError(f'File {file} not in <schema.object.sql> format.')
-        object_name = parts[0] + '.' + parts[1]
-    query = f"DROP {object_type} {object_name}"
-    execute_try_catch(engine, query=query)
+        return parts[0]
+    if len(parts) != 3:
+        raise RuntimeError(f'File {file} not in <schema.object.sql> format.')
+    return parts[0] + '.' + parts[1]
+
+
+def list_sql_files(directory: str) -> List[str]:
+    '''Return paths of the SQL script files (.sql) in directory.'''
+    with scandir(directory) as entries:
+        return [entry.path for entry in entries if entry.is_file() and entry.name.endswith('.sql')]
+
+
+def dependency_levels(sql_by_file: Dict[str, str]) -> List[List[str]]:
+    '''Group SQL script files into levels by the objects they create and reference.
+
+    Files in a level reference only objects created in files of the earlier levels.
+    Files with circular dependencies are returned together in the last level.
+    Within a level, files are kept in their original order.
+
+    Parameters
+    ----------
+    sql_by_file
+        SQL script file paths and their contents.
+
+    Returns
+    -------
+    list
+        Levels of file paths in execution order.
+    '''
+    creators = {}
+    for file, sql in sql_by_file.items():
+        for schema, name in CREATE_PATTERN.findall(sql):
+            creators.setdefault((schema.lower(), name.lower()), file)
+    dependencies = {}
+    for file, sql in sql_by_file.items():
+        references = {(schema.lower(), name.lower()) for schema, name in REFERENCE_PATTERN.findall(sql)}
+        dependencies[file] = {creators[ref] for ref in references if ref in creators} - {file}
+    levels = []
+    resolved = set()
+    remaining = list(sql_by_file)
+    while remaining:
+        level = [f for f in remaining if dependencies[f] <= resolved]
+        if not level:
+            levels.append(remaining)
+            break
+        levels.append(level)
+        resolved.update(level)
+        remaining = [f for f in remaining if f not in resolved]
+    return levels
+
+
+def parallel_file_loop(command: Callable[..., Any], *args: Any, levels: List[List[str]], max_workers: int) -> List[str]:
+    '''Execute the command to every file, level by level. The files of a level are executed
+    concurrently in a thread pool, and the next level is started when the previous is done.
+
+    Parameters
+    ----------
+    command
+        Function to be executed to every file in levels.
+    *args
+        Arguments passed to command.
+    levels
+        Levels of file paths, f.e. from dependency_levels.
+    max_workers
+        Maximum number of concurrent executions.
+
+    Returns
+    -------
+    list
+        Files for which command failed, in execution order.
+    '''
+    failed = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for level in levels:
+            futures = [(file, executor.submit(command, file, *args)) for file in level]
+            for file, future in futures:
+                error = future.exception()
+                if error is not None:
+                    # the file is retried, the error is logged to tell dependency errors from concurrency errors
+                    logger.debug(f'----- Concurrent execution failed for {file} -----')
+                    logger.debug(''.join(format_exception(type(error), error, error.__traceback__)))
+                    failed.append(file)
+    return failed
 
 
 def sql_file_loop(command: Callable[..., Any], *args: Any, file_list: list, max_loop: int = 10) -> dict:
-    '''Loop copy of file_list maximum max_loop times and execute the command to every file in
-    copy of file_list. If command succeeds, drop the the file from copy of file_list. If command
-    fails, keep the file in copy of file_list and execute the command again in next loop.
+    '''Loop pending files maximum max_loop times and execute the command to every pending file.
+    At first, all the files in file_list are pending. If command fails, the file is kept
+    pending and the command is executed again in next loop. Looping ends when there are no
+    pending files left.
 
-    When max_loop is reached and there are files in copy of file_list, return the remaining
+    When max_loop is reached and there are still pending files, return the remaining
     file names and related errors that surfaced during executions. Else return empty dict.
 
     Parameters
@@ -182,18 +330,20 @@ def sql_file_loop(command: Callable[..., Any], *args: Any, file_list: list, max_
     dict
         Failed files and related errors. Empty if no fails.
     '''
-    copy_list = file_list.copy()
-    copy_list_loop = copy_list.copy()
+    # two lists are swapped between loops: files failed in a loop are pending in the next
+    pending = list(file_list)
+    failed = []
     errors = defaultdict(set)
     for _ in range(max_loop):
-        for file in copy_list_loop:
+        if not pending:
+            break
+        for file in pending:
             try:
                 command(file, *args)
-                copy_list.remove(file)
             except:
                 error_str = '\n------\n' + format_exc()
                 errors[file].add(error_str)
-        copy_list_loop = copy_list.copy()
-    if len(copy_list) > 0:
-        return {f: list(errors[f]) for f in copy_list}
-    return {}
+                failed.append(file)
+        pending, failed = failed, pending
+        failed.clear()
+    return {f: list(errors[f]) for f in pending}
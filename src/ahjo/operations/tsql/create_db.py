@@ -5,8 +5,8 @@
 
 '''Module for database drop and create.
 
-Global variable QUERIES holds SQL select statements to
-retrieve session and database ids from database.'''
+Global variable QUERIES holds SQL statements to kill database
+sessions and to retrieve database ids from database.'''
 from os import path
 from typing import Union
 
@@ -15,7 +15,10 @@ from ahjo.operation_manager import OperationManager
 from sqlalchemy.engine import Engine
 
 QUERIES = {
-    'get_db_session': 'SELECT session_id FROM sys.dm_exec_sessions WHERE database_id = ?',
+    'kill_db_sessions': """DECLARE @sql NVARCHAR(MAX) = N'';
+        SELECT @sql = @sql + N'KILL ' + CAST(session_id AS NVARCHAR(10)) + N';'
+        FROM sys.dm_exec_sessions WHERE database_id = ? AND session_id <> @@SPID;
+        EXEC sys.sp_executesql @sql""",
     'get_db_id': 'SELECT db_id(?)',
     'get_existing_db': 'SELECT name from sys.databases where name = ?'
 }
@@ -50,12 +53,10 @@ def create_db(engine: Engine, db_name: str, db_path: str, log_path: str, init_si
         '''Kill all connections to database and connections made by given login.
         Drop login and database.
         '''
-        session_ids = execute_query(
-            engine, QUERIES.get('get_db_session'),
+        execute_query(
+            engine, QUERIES.get('kill_db_sessions'),
             variables=[database_id]
         )
-        for sid in session_ids:
-            execute_query(engine, f'KILL {sid.session_id}')
         execute_query(engine, f'DROP DATABASE {db_name}')
 
     def create_database():
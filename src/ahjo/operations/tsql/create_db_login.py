@@ -5,8 +5,10 @@
 
 '''Module for login drop and create.
 
-Global variable QUERIES holds SQL select statements to
-retrieve session ids and login name from database.'''
+Global variable QUERIES holds SQL statements to kill login sessions,
+retrieve login name from database, and to drop and create login.
+Login name, password and default database are passed as query parameters
+and quoted in SQL Server, not interpolated into SQL in Python.'''
 from logging import getLogger
 
 from ahjo.database_utilities import execute_query
@@ -16,8 +18,17 @@ from sqlalchemy.engine import Engine
 logger = getLogger('ahjo')
 
 QUERIES = {
-    'get_login_session': 'SELECT session_id FROM sys.dm_exec_sessions WHERE login_name = ?',
-    'get_login_name': 'SELECT loginname FROM master.dbo.syslogins WHERE name = ?'
+    'kill_login_sessions': """DECLARE @sql NVARCHAR(MAX) = N'';
+        SELECT @sql = @sql + N'KILL ' + CAST(session_id AS NVARCHAR(10)) + N';'
+        FROM sys.dm_exec_sessions WHERE login_name = ? AND session_id <> @@SPID;
+        EXEC sys.sp_executesql @sql""",
+    'get_login_name': 'SELECT loginname FROM master.dbo.syslogins WHERE name = ?',
+    'drop_login': "DECLARE @sql NVARCHAR(MAX) = N'DROP LOGIN ' + QUOTENAME(?); EXEC sys.sp_executesql @sql",
+    'create_login': """DECLARE @sql NVARCHAR(MAX) = N'CREATE LOGIN ' + QUOTENAME(?)
+        + N' WITH PASSWORD = N''' + REPLACE(?, N'''', N'''''') + N''''
+        + N', DEFAULT_DATABASE = ' + QUOTENAME(?)
+        + N', DEFAULT_LANGUAGE = [us_english], CHECK_EXPIRATION = OFF, CHECK_POLICY = OFF';
+        EXEC sys.sp_executesql @sql"""
 }
 
 
@@ -47,17 +58,14 @@ def create_db_login(engine: Engine, login_name: str, login_password: str, defaul
         Default database of login.
     '''
     with OperationManager('Creating database login'):
-        session_ids = execute_query(engine, QUERIES.get(
-            'get_login_session'), variables=[login_name])
-        for sid in session_ids:
-            execute_query(engine, f'KILL {sid.session_id}')
+        execute_query(engine, QUERIES.get(
+            'kill_login_sessions'), variables=[login_name])
         login = execute_query(engine, QUERIES.get(
             'get_login_name'), variables=[login_name])
         if len(login) > 0:
-            execute_query(engine, f'DROP LOGIN {login_name}')
+            execute_query(engine, QUERIES.get(
+                'drop_login'), variables=[login_name])
         if login_password == 'SALASANA':
             logger.info(f'Creating login {login_name} with default password.')
-        create_query = f"""CREATE LOGIN {login_name} WITH PASSWORD='{login_password}',
-            DEFAULT_DATABASE=[{default_db}], DEFAULT_LANGUAGE=[us_english],
-            CHECK_EXPIRATION=OFF, CHECK_POLICY=OFF"""
-        execute_query(engine, create_query)
+        execute_query(engine, QUERIES.get('create_login'),
+                      variables=[login_name, login_password, default_db])
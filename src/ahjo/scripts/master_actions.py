@@ -73,9 +73,10 @@ def structure(context):
 def deploy(context):
     """(MSSQL) Run 'alembic upgrade head'. Deploy functions, views and prodecures. Update extended properties and Git version."""
     op.upgrade_db_to_latest_alembic_version(context.config_filename)
-    op.deploy_sqlfiles(context.get_engine(), "./database/functions/", "Deploying functions")
-    op.deploy_sqlfiles(context.get_engine(), "./database/views/", "Deploying views")
-    op.deploy_sqlfiles(context.get_engine(), "./database/procedures/", "Deploying procedures")
+    max_workers = context.configuration.get('deploy_max_workers', 1)
+    op.deploy_sqlfiles(context.get_engine(), "./database/functions/", "Deploying functions", max_workers=max_workers)
+    op.deploy_sqlfiles(context.get_engine(), "./database/views/", "Deploying views", max_workers=max_workers)
+    op.deploy_sqlfiles(context.get_engine(), "./database/procedures/", "Deploying procedures", max_workers=max_workers)
     op.update_db_object_properties(
         context.get_engine(),
         context.configuration.get('metadata_allowed_schemas')
@@ -106,16 +106,18 @@ def write_sample_password_files(sample_root, username, password):
         f.write(password)
 
 
-@pytest.fixture(scope='function')
+@pytest.fixture(scope='session')
 def run_alembic_action():
-    """When executing, CWD must be set correctly to sample root!"""
-    def execute_alembic(action, target):
-        alembic_config = Config('alembic.ini')
+    """Paths are resolved relative to sample root given as root, by default CWD."""
+    def execute_alembic(action, target, root='.'):
+        alembic_config = Config(path.join(root, 'alembic.ini'))
         # main section options are set when main section is read
         main_section = alembic_config.config_ini_section
         alembic_config.get_section(main_section)
+        alembic_config.set_main_option('script_location', path.join(root, 'alembic'))
+        main_config = path.join(root, 'config_development.jsonc')
         alembic_config.cmd_opts = Namespace(
-            x=["main_config=config_development.jsonc"])
+            x=[f"main_config={main_config}"])
         if action == 'upgrade':
             command.upgrade(alembic_config, target)
         elif action == 'downgrade':
@@ -123,11 +125,11 @@ def run_alembic_action():
     return execute_alembic
 
 
-@pytest.fixture(scope='function')
+@pytest.fixture(scope='session')
 def populate_table():
-    """When executing, CWD must be set correctly to sample root!"""
-    def insert_to_table(engine, table_name):
-        source_file = path.join(SAMPLE_DATA_DIR, table_name)
+    """Paths are resolved relative to sample root given as root, by default CWD."""
+    def insert_to_table(engine, table_name, root='.'):
+        source_file = path.join(root, SAMPLE_DATA_DIR, table_name)
         splitted = table_name.split('.')
         if len(splitted) > 1:
             table_name = splitted[1]
@@ -11,6 +11,17 @@ PROC_DIR = './database/procedures'
 FUNC_DIR = './database/functions'
 MSSQL_COMMENTS = [r'/\*.+?\*/', r'--.[ \S]+?\n']
 MSSQL_BATCH_SEP = '\nGO'
+# pool connections across tests, batch parameters of executemany (f.e. populate_table)
+ENGINE_OPTIONS = {
+    'pool_size': 8,
+    'max_overflow': 0,
+    'pool_recycle': -1,
+    'fast_executemany': True
+}
+KILL_DB_SESSIONS = """DECLARE @sql NVARCHAR(MAX) = N'';
+    SELECT @sql = @sql + N'KILL ' + CAST(session_id AS NVARCHAR(10)) + N';'
+    FROM sys.dm_exec_sessions WHERE database_id = DB_ID(?) AND session_id <> @@SPID;
+    EXEC sys.sp_executesql @sql"""
 
 
 @pytest.fixture(scope='session')
@@ -29,16 +40,7 @@ def mssql_master_engine(request, ahjo_config, mssql_sample):
     """Create engine for MSSQL server master database.
     """
     config = ahjo_config(mssql_sample)
-    connection_url = URL(
-        drivername="mssql+pyodbc",
-        username=request.config.getoption('mssql_username'),
-        password=request.config.getoption('mssql_password'),
-        host=config['target_server_hostname'],
-        port=config['sql_port'],
-        database='master',
-        query={'driver': config['sql_driver']}
-    )
-    return create_engine(connection_url)
+    return create_mssql_engine(request, config, 'master')
 
 
 @pytest.fixture(scope='session')
@@ -46,16 +48,21 @@ def mssql_engine(request, ahjo_config, mssql_sample):
     """Create engine for MSSQL server test database.
     """
     config = ahjo_config(mssql_sample)
+    return create_mssql_engine(request, config, config['target_database_name'])
+
+
+def create_mssql_engine(request, config, database):
+    """Create engine with connection pool shared by the whole test session."""
     connection_url = URL(
         drivername="mssql+pyodbc",
         username=request.config.getoption('mssql_username'),
         password=request.config.getoption('mssql_password'),
         host=config['target_server_hostname'],
         port=config['sql_port'],
-        database=config['target_database_name'],
+        database=database,
         query={'driver': config['sql_driver']}
     )
-    return create_engine(connection_url)
+    return create_engine(connection_url, **ENGINE_OPTIONS)
 
 
 @pytest.fixture(scope='session')
@@ -72,20 +79,18 @@ def mssql_setup_and_teardown(mssql_master_engine, test_db_name):
     yield
     with mssql_master_engine.connect() as connection:
         connection.execution_options(isolation_level="AUTOCOMMIT")
-        result = connection.execute(
-            'SELECT session_id FROM sys.dm_exec_sessions WHERE database_id = DB_ID(?)', (test_db_name,))
-        for row in result.fetchall():
-            connection.execute(f'KILL {row.session_id}')
+        connection.execute(KILL_DB_SESSIONS, (test_db_name,))
         connection.execute(f'DROP DATABASE {test_db_name}')
 
 
-@pytest.fixture(scope='function')
+@pytest.fixture(scope='session')
 def deploy_mssql_objects():
-    """When executing, CWD must be set correctly to sample root!"""
-    def deploy_objects(engine):
-        w_files = [path.join(VIEWS_DIR, f) for f in listdir(VIEWS_DIR)]
-        p_files = [path.join(PROC_DIR, f) for f in listdir(PROC_DIR)]
-        f_files = [path.join(FUNC_DIR, f) for f in listdir(FUNC_DIR)]
+    """Paths are resolved relative to sample root given as root, by default CWD."""
+    def deploy_objects(engine, root='.'):
+        views_dir, proc_dir, func_dir = [path.join(root, d) for d in (VIEWS_DIR, PROC_DIR, FUNC_DIR)]
+        w_files = [path.join(views_dir, f) for f in listdir(views_dir)]
+        p_files = [path.join(proc_dir, f) for f in listdir(proc_dir)]
+        f_files = [path.join(func_dir, f) for f in listdir(func_dir)]
         files = w_files + p_files + f_files
     
         for tsql in files:
@@ -104,13 +109,14 @@ def deploy_mssql_objects():
     return deploy_objects
 
 
-@pytest.fixture(scope='function')
+@pytest.fixture(scope='session')
 def drop_mssql_objects():
-    """When executing, CWD must be set correctly to sample root!"""
-    def drop_objects(engine):
-        w_objects = [f"VIEW [{f.split('.')[0]}].[{f.split('.')[1]}]" for f in listdir(VIEWS_DIR)]
-        p_objects = [f"PROCEDURE [{f.split('.')[0]}].[{f.split('.')[1]}]" for f in listdir(PROC_DIR)]
-        f_objects = [f"FUNCTION [{f.split('.')[0]}].[{f.split('.')[1]}]" for f in listdir(FUNC_DIR)]
+    """Paths are resolved relative to sample root given as root, by default CWD."""
+    def drop_objects(engine, root='.'):
+        views_dir, proc_dir, func_dir = [path.join(root, d) for d in (VIEWS_DIR, PROC_DIR, FUNC_DIR)]
+        w_objects = [f"VIEW [{f.split('.')[0]}].[{f.split('.')[1]}]" for f in listdir(views_dir)]
+        p_objects = [f"PROCEDURE [{f.split('.')[0]}].[{f.split('.')[1]}]" for f in listdir(proc_dir)]
+        f_objects = [f"FUNCTION [{f.split('.')[0]}].[{f.split('.')[1]}]" for f in listdir(func_dir)]
         database_objects = w_objects + p_objects + f_objects
     
         for db_object in database_objects:
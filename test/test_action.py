@@ -0,0 +1,59 @@
+import logging
+
+import pytest
+
+import ahjo.action as ahjo
+
+
+class ContextMock:
+    def get_conn_info(self):
+        return {'server': 'localhost', 'database': 'AHJO_TEST'}
+
+
+@pytest.fixture(scope="function")
+def registeration(monkeypatch):
+    """Create action registeration that affects database to empty action register.
+    Make user confirmation fail, if it is asked.
+    """
+    monkeypatch.setattr(ahjo, 'registered_actions', {})
+    def confirmation_should_not_be_asked(message):
+        raise AssertionError('Confirmation was asked')
+    monkeypatch.setattr(ahjo, 'are_you_sure', confirmation_should_not_be_asked)
+    monkeypatch.delenv('AHJO_ASSUME_YES', raising=False)
+    monkeypatch.delenv('AHJO_ASSUME_NO', raising=False)
+    return ahjo.ActionRegisteration(lambda context: None, 'test-action', True)
+
+
+def test_pre_exec_check_should_pass_if_assume_yes(registeration, monkeypatch):
+    monkeypatch.setenv('AHJO_ASSUME_YES', '1')
+    assert registeration.pre_exec_check(ContextMock()) is True
+
+
+def test_pre_exec_check_should_fail_if_assume_no(registeration, monkeypatch):
+    monkeypatch.setenv('AHJO_ASSUME_YES', '1')
+    monkeypatch.setenv('AHJO_ASSUME_NO', '1')
+    assert registeration.pre_exec_check(ContextMock()) is False
+
+
+def test_list_actions_should_show_action_registered_after_listing(registeration, caplog):
+    caplog.set_level(logging.INFO, logger='ahjo')
+    ahjo.list_actions()
+    assert "'test-action'" in caplog.text
+    assert "'other-action'" not in caplog.text
+    ahjo.ActionRegisteration(lambda context: None, 'other-action', False)
+    caplog.clear()
+    ahjo.list_actions()
+    assert "'test-action'" in caplog.text
+    assert "'other-action'" in caplog.text
+
+
+def test_check_action_validity_should_not_match_substring_of_allowed_action(registeration):
+    ahjo.ActionRegisteration(lambda context: None, 'test', False)
+    assert ahjo.check_action_validity('test', 'test-action') is False
+    assert ahjo.check_action_validity('test', ['test-action']) is False
+
+
+def test_check_action_validity_should_match_allowed_action_name(registeration):
+    assert ahjo.check_action_validity('test-action', 'test-action') is True
+    assert ahjo.check_action_validity('test-action', ['deploy', 'test-action']) is True
+    assert ahjo.check_action_validity('test-action', 'ALL') is True
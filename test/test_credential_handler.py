@@ -11,35 +11,43 @@ def obfuscate(stng):
 
 
 @pytest.fixture(scope="function")
-def execute_get_credentials_with_varying_input(tmp_path, monkeypatch):
+def key_file(tmp_path, monkeypatch):
+    """Use encryption key file in temporary directory instead of user's home directory."""
+    key_file = tmp_path / 'key'
+    monkeypatch.setattr(ahjo, 'KEY_FILE', key_file)
+    monkeypatch.setattr(ahjo, '_key', None)
+    return key_file
+
+
+@pytest.fixture(scope="function")
+def execute_get_credentials_with_varying_input(tmp_path, monkeypatch, key_file):
     """First, reset global variable of Ahjo's credential_handler module.
         If this is not done, tests will affect one another.
     Second, create username/password files with given content and store
         file paths to list created_records.
     Third, set username/password input with monkeypatch.
-    Fourth, execute ahjo.get_credentials with created username/password file
-        paths as parameters (None if no file created).
+    Fourth, execute ahjo.get_credentials with username/password file
+        paths as parameters (None if no file name given).
+        Encryption key file is created to tmp_path, if password is encrypted.
     Fifth, reset global variable of Ahjo's credential_handler module.
         If this is not done, tests will affect one another.
     Finally, delete created username/password files.
     """
     # reset global variable
-    ahjo.cred_dict = {}
+    ahjo._cred_dict.clear()
 
     created_records = []
 
-    def get_credentials(usrn_file_name, usrn_file_content, pw_file_name, pw_file_content, usrn_input, pw_input, ask_pw=True):
+    def get_credentials(usrn_file_name, usrn_file_content, pw_file_name, pw_file_content, usrn_input, pw_input, ask_pw=True, encrypt=False):
         # create username file if file name and content given
-        usrn_file_path = None
-        if usrn_file_name and usrn_file_content is not None:
-            usrn_file_path = tmp_path / usrn_file_name
+        usrn_file_path = tmp_path / usrn_file_name if usrn_file_name else None
+        if usrn_file_path and usrn_file_content is not None:
             usrn_file_path.write_text(
                 f"cred={usrn_file_content}", encoding="utf-8")
             created_records.append(str(usrn_file_path))
         # create password file if file name and content given
-        pw_file_path = None
-        if pw_file_name and pw_file_content is not None:
-            pw_file_path = tmp_path / pw_file_name
+        pw_file_path = tmp_path / pw_file_name if pw_file_name else None
+        if pw_file_path and pw_file_content is not None:
             pw_file_path.write_text(
                 f"cred={pw_file_content}", encoding="utf-8")
             created_records.append(str(pw_file_path))
@@ -47,14 +55,14 @@ def execute_get_credentials_with_varying_input(tmp_path, monkeypatch):
         monkeypatch.setattr('builtins.input', lambda x: usrn_input)
         monkeypatch.setattr('getpass.getpass', lambda x: pw_input)
         if ask_pw:
-            return ahjo.get_credentials(usrn_file_path=usrn_file_path, pw_file_path=pw_file_path)
+            return ahjo.get_credentials(usrn_file_path=usrn_file_path, pw_file_path=pw_file_path, encrypt=encrypt)
         else:
-            return ahjo.get_credentials(usrn_file_path=usrn_file_path, pw_file_path=pw_file_path, pw_prompt=None)
+            return ahjo.get_credentials(usrn_file_path=usrn_file_path, pw_file_path=pw_file_path, pw_prompt=None, encrypt=encrypt)
 
     yield get_credentials
 
     # reset global variable
-    ahjo.cred_dict = {}
+    ahjo._cred_dict.clear()
 
     # executed despite of result
     for record in created_records:
@@ -138,3 +146,124 @@ def test_password_should_not_be_asked_if_pw_prompt_is_none(execute_get_credentia
     """
     testinput = ("usrn3.txt", "USER", None, None, "USER3", "PASSWORD3", False)
     assert ("USER3", "") == execute_get_credentials_with_varying_input(*testinput)
+
+
+def test_stored_key_value_pairs_should_be_found_from_file(tmp_path):
+    """Store multiple key value pairs to the same file - all keys can be looked up.
+    input: ("cred", "USER6"), ("cred2", "USER7")
+    output: "USER6", "USER7"
+    """
+    file_path = str(tmp_path / "usrn6.txt")
+    ahjo.store_to_file("cred", "USER6", file_path)
+    ahjo.store_many_to_file([("cred2", "USER7"), ("cred3", "")], file_path)
+    assert ahjo.lookup_from_file("cred", file_path) == "USER6"
+    assert ahjo.lookup_from_file("cred2", file_path) == "USER7"
+    assert ahjo.lookup_from_file("cred3", file_path) == ""
+
+
+def test_store_should_not_corrupt_file_without_trailing_newline(tmp_path):
+    """Store key value pair to file written without trailing newline - both keys can be looked up.
+    input: "cred=USER", ("cred2", "USER2")
+    output: "USER", "USER2"
+    """
+    file_path = tmp_path / "usrn7.txt"
+    file_path.write_text("cred=USER", encoding="utf-8")
+    ahjo.store_to_file("cred2", "USER2", str(file_path))
+    assert file_path.read_text() == "cred=USER\ncred2=USER2\n"
+    assert ahjo.lookup_from_file("cred", str(file_path)) == "USER"
+    assert ahjo.lookup_from_file("cred2", str(file_path)) == "USER2"
+
+
+def test_lookup_should_notice_modified_file(tmp_path):
+    """Modify file after lookup - new value is returned.
+    input: "cred=USER8" -> "cred=USER9"
+    output: "USER8", "USER9"
+    """
+    file_path = tmp_path / "usrn8.txt"
+    file_path.write_text("cred=USER8", encoding="utf-8")
+    assert ahjo.lookup_from_file("cred", str(file_path)) == "USER8"
+    file_path.write_text("cred=USER9\n", encoding="utf-8")
+    assert ahjo.lookup_from_file("cred", str(file_path)) == "USER9"
+
+
+def test_encrypted_password_should_be_decrypted(key_file):
+    """Encrypt password with ChaCha20-Poly1305 - decrypted password equals original.
+    input: ("USER10", "PASSWORD10")
+    output: ("USER10", "PASSWORD10")
+    """
+    pytest.importorskip("cryptography")
+    obfuscated = ahjo.obfuscate_credentials(("USER10", "PASSWORD10"), encrypt=True)
+    assert obfuscated[1].startswith(ahjo.ENCRYPTED_PREFIX)
+    assert "PASSWORD10" not in obfuscated[1]
+    assert ("USER10", "PASSWORD10") == ahjo.deobfuscate_credentials(obfuscated)
+
+
+def test_password_should_not_be_encrypted_by_default(execute_get_credentials_with_varying_input, key_file):
+    """Store credentials without encrypt flag - password is base64 encoded and no key file is created.
+    input: file_path, None, file_path, None, "USER11", "PASSWORD11"
+    output: "cred=" + base64("PASSWORD11")
+    """
+    testinput = ("usrn11.txt", None, "pw11.txt", None, "USER11", "PASSWORD11")
+    assert ("USER11", "PASSWORD11") == execute_get_credentials_with_varying_input(*testinput)
+    assert (key_file.parent / "pw11.txt").read_text() == f"cred={obfuscate('PASSWORD11')}\n"
+    assert not key_file.exists()
+
+
+def test_password_should_not_be_obfuscated_when_not_stored(execute_get_credentials_with_varying_input, key_file):
+    """Ask credentials without files and with encrypt flag - no key file is created.
+    input: None, None, None, None, "USER12", "PASSWORD12"
+    output: ("USER12", "PASSWORD12")
+    """
+    testinput = (None, None, None, None, "USER12", "PASSWORD12")
+    assert ("USER12", "PASSWORD12") == execute_get_credentials_with_varying_input(*testinput, encrypt=True)
+    assert not key_file.exists()
+
+
+def test_stored_password_should_be_encrypted_when_requested(execute_get_credentials_with_varying_input, key_file):
+    """Store credentials with encrypt flag - password file holds encrypted password.
+    input: file_path, None, file_path, None, "USER13", "PASSWORD13"
+    output: ("USER13", "PASSWORD13")
+    """
+    pytest.importorskip("cryptography")
+    testinput = ("usrn13.txt", None, "pw13.txt", None, "USER13", "PASSWORD13")
+    assert ("USER13", "PASSWORD13") == execute_get_credentials_with_varying_input(*testinput, encrypt=True)
+    pw_file_path = str(key_file.parent / "pw13.txt")
+    assert ahjo.lookup_from_file("cred", pw_file_path).startswith(ahjo.ENCRYPTED_PREFIX)
+
+
+def test_key_file_should_be_created_once(tmp_path):
+    """Create key when key file exists - existing key is kept.
+    input: existing 32 byte key file
+    output: existing key
+    """
+    pytest.importorskip("cryptography")
+    key_file = tmp_path / 'key'
+    key_file.write_bytes(b'k' * 32)
+    ahjo._create_key_file(key_file)
+    assert key_file.read_bytes() == b'k' * 32
+    assert [f.name for f in tmp_path.iterdir()] == ['key']
+
+
+def test_corrupted_key_file_should_raise_error(key_file):
+    """Read truncated key file - ValueError with the key file path is raised.
+    input: empty key file
+    output: ValueError
+    """
+    key_file.write_bytes(b'')
+    with pytest.raises(ValueError, match='corrupted'):
+        ahjo._get_key()
+
+
+def test_default_key_file_should_be_in_home_directory(tmp_path, monkeypatch):
+    """Key file not configured - key is created to ~/.ahjo/key.
+    input: HOME=tmp_path
+    output: tmp_path/.ahjo/key with a 32 byte key
+    """
+    pytest.importorskip("cryptography")
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setenv('USERPROFILE', str(tmp_path))
+    monkeypatch.setattr(ahjo, 'KEY_FILE', None)
+    monkeypatch.setattr(ahjo, '_key', None)
+    key = ahjo._get_key()
+    assert (tmp_path / '.ahjo' / 'key').read_bytes() == key
+    assert len(key) == ahjo.KEY_LENGTH
@@ -1,11 +1,20 @@
-from os import chdir, getcwd, path
+from os import path
 
 import ahjo.database_utilities.sqla_utilities as ahjo
 import pytest
-from yaml import safe_load
+from sqlalchemy import text
+from yaml import load
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 
 MSSQL_PATTERNS = ahjo.get_dialect_patterns('mssql')
 POSTGRESQL_PATTERNS = ahjo.get_dialect_patterns('postgresql')
+VIEW_COUNT_QUERY = text("SELECT COUNT(*) FROM INFORMATION_SCHEMA.VIEWS WHERE TABLE_SCHEMA = :s AND TABLE_NAME IN (:n1, :n2)")
+PRODUCT_CATEGORY_COUNT_QUERY = text("SELECT COUNT(*) FROM store.ProductCategory")
+QUERY_FILE_PATH = path.join(path.dirname(path.realpath(__file__)), 'test_execute_from_file.yaml')
 
 
 @pytest.mark.parametrize("file_name", ['store.vwClients_UTF_16'])
@@ -15,68 +24,79 @@ def test_execute_from_file_should_raise_error_if_file_is_not_utf_8_bom(mssql_sam
         ahjo.execute_from_file(None, sql_file)
 
 
+@pytest.mark.parametrize("encoding", ['utf-16', 'utf-32'])
+def test_execute_from_file_should_raise_error_if_content_has_utf_16_or_32_bom(encoding):
+    file_content = 'SELECT 1'.encode(encoding)
+    with pytest.raises(ValueError):
+        ahjo.execute_from_file(None, 'query.sql', file_content=file_content)
+
+
 @pytest.mark.mssql
 class TestWithSQLServer():
-    @pytest.fixture(scope='function', autouse=True)
-    def exec_from_file_mssql_setup_and_teardown(self, ahjo_config, mssql_sample, mssql_engine, run_alembic_action, drop_mssql_objects):
-        self.config = ahjo_config(mssql_sample)
-        self.alembic_table = self.config['alembic_version_table_schema'] + \
-            '.' + self.config['alembic_version_table']
-        self.engine = mssql_engine
-        old_cwd = getcwd()
-        chdir(mssql_sample)
-        run_alembic_action('upgrade', 'head')
+    @pytest.fixture(scope='class', autouse=True)
+    def exec_from_file_mssql_setup_and_teardown(self, request, ahjo_config, mssql_sample, mssql_engine, run_alembic_action, drop_mssql_objects):
+        cls = request.cls
+        cls.config = ahjo_config(mssql_sample)
+        cls.alembic_table = cls.config['alembic_version_table_schema'] + \
+            '.' + cls.config['alembic_version_table']
+        cls.engine = mssql_engine
+        cls.sample_dir = mssql_sample
+        run_alembic_action('upgrade', 'head', mssql_sample)
         yield
-        drop_mssql_objects(self.engine)
-        run_alembic_action('downgrade', 'base')
-        query = f"DROP TABLE {self.alembic_table}"
-        self.engine.execute(query)
-        chdir(old_cwd)
-
-    @pytest.mark.parametrize("object_name", ['store.vwClients', 'store.vwProducts'])
-    def test_execute_from_file_should_create_view(self, object_name):
-        schema, name = object_name.split('.')
-        query = "SELECT * FROM INFORMATION_SCHEMA.VIEWS WHERE TABLE_SCHEMA = ? AND TABLE_NAME = ?"
-        result = self.engine.execute(query, (schema, name)).fetchall()
-        assert not result
-        ahjo.execute_from_file(
-            self.engine,
-            f'database/views/{object_name}.sql'
-            )
-        result = self.engine.execute(query, (schema, name)).fetchall()
-        assert len(result) == 1
+        drop_mssql_objects(cls.engine, mssql_sample)
+        run_alembic_action('downgrade', 'base', mssql_sample)
+        query = f"DROP TABLE {cls.alembic_table}"
+        cls.engine.execute(query)
+
+    def test_execute_from_file_should_create_view(self):
+        object_names = ['store.vwClients', 'store.vwProducts']
+        params = {'s': 'store', 'n1': 'vwClients', 'n2': 'vwProducts'}
+        with self.engine.connect() as conn:
+            assert conn.execute(VIEW_COUNT_QUERY, params).scalar() == 0
+            for object_name in object_names:
+                ahjo.execute_from_file(
+                    self.engine,
+                    path.join(self.sample_dir, f'database/views/{object_name}.sql')
+                    )
+            assert conn.execute(VIEW_COUNT_QUERY, params).scalar() == 2
+
+    @pytest.fixture(scope='function')
+    def empty_product_category(self):
+        """Remove rows inserted by test, the schema is shared by the tests of the class.
+        TRUNCATE is not autocommitted by SQL Alchemy, so it is run in a transaction."""
+        yield
+        with self.engine.begin() as conn:
+            conn.execute(text("TRUNCATE TABLE store.ProductCategory"))
 
-    # possibility to parametrize
-    def test_execute_from_file_should_insert_data(self):
+    # second run fails if rows of the first run are not removed
+    @pytest.mark.parametrize("run", [1, 2])
+    def test_execute_from_file_should_insert_data(self, empty_product_category, run):
         object_name = 'store.ProductCategory'
-        query = f"SELECT COUNT(*) FROM {object_name}"
-        result = self.engine.execute(query).fetchall()
-        assert result[0] == (0,)
-        ahjo.execute_from_file(self.engine, f'database/data/{object_name}.sql')
-        result = self.engine.execute(query).fetchall()
-        assert result[0] == (3,)
+        with self.engine.connect() as conn:
+            assert conn.execute(PRODUCT_CATEGORY_COUNT_QUERY).scalar() == 0
+            ahjo.execute_from_file(self.engine, path.join(self.sample_dir, f'database/data/{object_name}.sql'))
+            assert conn.execute(PRODUCT_CATEGORY_COUNT_QUERY).scalar() == 3
 
 
 @pytest.mark.mssql
 class TestWithPopulatedSQLServer():
-    @pytest.fixture(scope='function', autouse=True)
-    def exec_from_file_mssql_setup_and_teardown(self, ahjo_config, mssql_sample, mssql_engine, run_alembic_action, deploy_mssql_objects, drop_mssql_objects, populate_table):
-        self.config = ahjo_config(mssql_sample)
-        self.alembic_table = self.config['alembic_version_table_schema'] + \
-            '.' + self.config['alembic_version_table']
-        self.engine = mssql_engine
-        old_cwd = getcwd()
-        chdir(mssql_sample)
-        run_alembic_action('upgrade', 'head')
-        deploy_mssql_objects(self.engine)
-        populate_table(self.engine, 'store.Clients')
-        populate_table(self.engine, 'store.Products')
+    @pytest.fixture(scope='class', autouse=True)
+    def exec_from_file_mssql_setup_and_teardown(self, request, ahjo_config, mssql_sample, mssql_engine, run_alembic_action, deploy_mssql_objects, drop_mssql_objects, populate_table):
+        cls = request.cls
+        cls.config = ahjo_config(mssql_sample)
+        cls.alembic_table = cls.config['alembic_version_table_schema'] + \
+            '.' + cls.config['alembic_version_table']
+        cls.engine = mssql_engine
+        cls.sample_dir = mssql_sample
+        run_alembic_action('upgrade', 'head', mssql_sample)
+        deploy_mssql_objects(cls.engine, mssql_sample)
+        populate_table(cls.engine, 'store.Clients', mssql_sample)
+        populate_table(cls.engine, 'store.Products', mssql_sample)
         yield
-        drop_mssql_objects(self.engine)
-        run_alembic_action('downgrade', 'base')
-        query = f"DROP TABLE {self.alembic_table}"
-        self.engine.execute(query)
-        chdir(old_cwd)
+        drop_mssql_objects(cls.engine, mssql_sample)
+        run_alembic_action('downgrade', 'base', mssql_sample)
+        query = f"DROP TABLE {cls.alembic_table}"
+        cls.engine.execute(query)
 
     @pytest.mark.parametrize("query_name,result_set", [
         ('clients_are_populated', [['QUESTION', 'ANSWER'], ('Is Clients Populated?', 'YES')]),  # nopep8
@@ -85,7 +105,7 @@ class TestWithPopulatedSQLServer():
     def test_execute_from_file_should_return_query_results(self, query_name, result_set):
         query_result = ahjo.execute_from_file(
             self.engine,
-            f'database/tests/{query_name}.sql',
+            path.join(self.sample_dir, f'database/tests/{query_name}.sql'),
             include_headers=True
             )
         assert query_result == result_set
@@ -96,35 +116,33 @@ class TestWithPopulatedSQLServer():
     def test_execute_from_file_should_handle_variables(self, query_name, result_set, test_db_name):
         query_result = ahjo.execute_from_file(
             self.engine,
-            f'database/tests/{query_name}.sql',
+            path.join(self.sample_dir, f'database/tests/{query_name}.sql'),
             scripting_variables={"DB_NAME": test_db_name},
             include_headers=True
         )
         assert query_result == result_set
 
 
-def get_query(dialect_name, query_key):
-    """Get query used in test from config."""
-    current_dir = path.dirname(path.realpath(__file__))
-    query_file_path = path.join(current_dir, 'test_execute_from_file.yaml')
-    with open(query_file_path, 'r') as f:
-        queries = safe_load(f)
-    return queries[dialect_name][query_key]
+@pytest.fixture(scope='session')
+def queries():
+    """Read and parse queries used in tests only once."""
+    with open(QUERY_FILE_PATH, 'r') as f:
+        return load(f, Loader=SafeLoader)
 
 
-@pytest.mark.parametrize("scripting_variables", [None, 'testi', ['value'], 10])
-def test_insert_script_variables_should_raise_error_if_not_dict(scripting_variables):
-    sql = get_query('mssql', 'query1')['sql_with_variables']
-    with pytest.raises(AttributeError):
-        ahjo._insert_script_variables(
-            dialect_patterns=MSSQL_PATTERNS,
-            sql=sql,
-            scripting_variables=scripting_variables
-        )
+def test_insert_script_variables_should_raise_error_if_not_dict(queries):
+    sql = queries['mssql']['query1']['sql_with_variables']
+    for scripting_variables in (None, 'testi', ['value'], 10):
+        with pytest.raises(AttributeError):
+            ahjo._insert_script_variables(
+                dialect_patterns=MSSQL_PATTERNS,
+                sql=sql,
+                scripting_variables=scripting_variables
+            )
 
 
-def test_insert_script_variables_should_not_do_anything_if_empty_dict():
-    sql_before = get_query('mssql', 'query1')['sql_with_variables']
+def test_insert_script_variables_should_not_do_anything_if_empty_dict(queries):
+    sql_before = queries['mssql']['query1']['sql_with_variables']
     sql_after = ahjo._insert_script_variables(
         dialect_patterns=MSSQL_PATTERNS,
         sql=sql_before,
@@ -134,8 +152,8 @@ def test_insert_script_variables_should_not_do_anything_if_empty_dict():
 
 
 @pytest.mark.parametrize('query_key', ['query1'])
-def test_insert_script_variables_with_no_dialect(query_key):
-    query = get_query('empty', query_key)
+def test_insert_script_variables_with_no_dialect(query_key, queries):
+    query = queries['empty'][query_key]
     sql_without_variables = ahjo._insert_script_variables(
         dialect_patterns={},
         sql=query['sql_with_variables'],
@@ -147,8 +165,8 @@ def test_insert_script_variables_with_no_dialect(query_key):
 
 
 @pytest.mark.parametrize('query_key', ['query1'])
-def test_insert_script_variables_with_mssql(query_key):
-    query = get_query('mssql', query_key)
+def test_insert_script_variables_with_mssql(query_key, queries):
+    query = queries['mssql'][query_key]
     tsql_without_variables = ahjo._insert_script_variables(
         dialect_patterns=MSSQL_PATTERNS,
         sql=query['sql_with_variables'],
@@ -158,11 +176,20 @@ def test_insert_script_variables_with_mssql(query_key):
         assert key not in tsql_without_variables
     assert tsql_without_variables == query['sql_with_value']
 
+
+def test_insert_script_variables_should_prefer_longest_variable_name():
+    sql_without_variables = ahjo._insert_script_variables(
+        dialect_patterns=POSTGRESQL_PATTERNS,
+        sql="SELECT :id, :id_2",
+        scripting_variables={'id': '1', 'id_2': ':id'}
+    )
+    assert sql_without_variables == "SELECT 1, :id"
+
 # test_insert_script_variables_with_postgresql
 
 @pytest.mark.parametrize('query_key', ['query1'])
-def test_split_to_batches_with_empty_dialect_should_not_split(query_key):
-    query = get_query('empty', query_key)
+def test_split_to_batches_with_empty_dialect_should_not_split(query_key, queries):
+    query = queries['empty'][query_key]
     batches = ahjo._split_to_batches(
         dialect_patterns={},
         sql=query['sql_with_value']
@@ -172,8 +199,8 @@ def test_split_to_batches_with_empty_dialect_should_not_split(query_key):
 
 
 @pytest.mark.parametrize('query_key', ['query1', 'query2'])
-def test_split_to_batches_with_mssql_dialect_should_split_with_go(query_key):
-    query = get_query('mssql', query_key)
+def test_split_to_batches_with_mssql_dialect_should_split_with_go(query_key, queries):
+    query = queries['mssql'][query_key]
     batches = ahjo._split_to_batches(
         dialect_patterns=MSSQL_PATTERNS,
         sql=query['sql_with_value']
@@ -184,8 +211,8 @@ def test_split_to_batches_with_mssql_dialect_should_split_with_go(query_key):
 
 
 @pytest.mark.parametrize('query_key', ['query1'])
-def test_split_to_batches_with_postgresql_dialect_should_split_with_semicolon(query_key):
-    query = get_query('postgresql', query_key)
+def test_split_to_batches_with_postgresql_dialect_should_split_with_semicolon(query_key, queries):
+    query = queries['postgresql'][query_key]
     batches = ahjo._split_to_batches(
         dialect_patterns=POSTGRESQL_PATTERNS,
         sql=query['sql_with_value']
@@ -1,5 +1,3 @@
-from os import chdir, getcwd
-
 import ahjo.database_utilities.sqla_utilities as ahjo
 import pytest
 from sqlalchemy.exc import DBAPIError, ProgrammingError
@@ -9,13 +7,12 @@ from sqlalchemy.exc import DBAPIError, ProgrammingError
 class TestWithPopulatedSQLServer():
 
     @pytest.fixture(scope='function', autouse=True)
-    def execute_query_mssql_setup_and_teardown(self, ahjo_config, mssql_sample, mssql_engine, run_alembic_action, deploy_mssql_objects, drop_mssql_objects, populate_table):
+    def execute_query_mssql_setup_and_teardown(self, monkeypatch, ahjo_config, mssql_sample, mssql_engine, run_alembic_action, deploy_mssql_objects, drop_mssql_objects, populate_table):
         self.config = ahjo_config(mssql_sample)
         self.alembic_table = self.config['alembic_version_table_schema'] + \
             '.' + self.config['alembic_version_table']
         self.engine = mssql_engine
-        old_cwd = getcwd()
-        chdir(mssql_sample)
+        monkeypatch.chdir(mssql_sample)
         run_alembic_action('upgrade', 'head')
         deploy_mssql_objects(self.engine)
         populate_table(self.engine, 'store.Clients')
@@ -24,7 +21,6 @@ class TestWithPopulatedSQLServer():
         run_alembic_action('downgrade', 'base')
         query = f"DROP TABLE {self.alembic_table}"
         self.engine.execute(query)
-        chdir(old_cwd)
 
     def test_execute_query_should_return_rows(self):
         result = ahjo.execute_query(
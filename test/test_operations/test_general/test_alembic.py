@@ -1,5 +1,5 @@
 import logging
-from os import chdir, getcwd, path
+from os import path
 
 import ahjo.operations.general.alembic as alembic
 import pytest
@@ -11,13 +11,12 @@ LATEST_REVISION = 'a8877159cdff'   # from sample project
 class TestWithSQLServer():
 
     @pytest.fixture(scope='function', autouse=True)
-    def alembic_mssql_setup_and_teardown(self, ahjo_config, mssql_sample, mssql_engine, run_alembic_action):
+    def alembic_mssql_setup_and_teardown(self, monkeypatch, ahjo_config, mssql_sample, mssql_engine, run_alembic_action):
         self.config = ahjo_config(mssql_sample)
         self.alembic_table = self.config['alembic_version_table_schema'] + '.' + self.config['alembic_version_table']
         self.config_filepath = path.join(mssql_sample, 'config_development.jsonc')
         self.engine = mssql_engine
-        old_cwd = getcwd()
-        chdir(mssql_sample)
+        monkeypatch.chdir(mssql_sample)
         yield
         try:
             run_alembic_action('downgrade', 'base')
@@ -25,7 +24,6 @@ class TestWithSQLServer():
             self.engine.execute(query)
         except:
             pass
-        chdir(old_cwd)
 
     def test_alembic_version_table_should_not_exist(self):
         query = f"SELECT * FROM {self.alembic_table}"
@@ -0,0 +1,117 @@
+import logging
+
+import pytest
+
+import ahjo.operations.general.sqlfiles as sqlfiles
+
+
+def test_sql_file_loop_should_retry_failed_files():
+    executed = []
+
+    def command(file):
+        if file == 'b.sql' and 'a.sql' not in executed:
+            raise RuntimeError('a.sql must be executed first')
+        executed.append(file)
+
+    failed = sqlfiles.sql_file_loop(command, file_list=['b.sql', 'a.sql'], max_loop=2)
+    assert failed == {}
+    assert executed == ['a.sql', 'b.sql']
+
+
+def test_sql_file_loop_should_not_retry_succeeded_files():
+    executed = []
+    failed = sqlfiles.sql_file_loop(executed.append, file_list=['a.sql', 'b.sql'], max_loop=5)
+    assert failed == {}
+    assert executed == ['a.sql', 'b.sql']
+
+
+def test_sql_file_loop_should_return_failed_files_with_errors():
+    def command(file):
+        if file == 'b.sql':
+            raise RuntimeError('Always fails')
+
+    failed = sqlfiles.sql_file_loop(command, file_list=['a.sql', 'b.sql'], max_loop=3)
+    assert list(failed.keys()) == ['b.sql']
+    assert len(failed['b.sql']) == 1
+    assert 'Always fails' in failed['b.sql'][0]
+
+
+def test_list_sql_files_should_only_return_sql_files(tmp_path):
+    (tmp_path / 'store.vwClients.sql').write_text('SELECT 1')
+    (tmp_path / 'README.md').write_text('Not SQL')
+    (tmp_path / 'subdir.sql').mkdir()
+    files = sqlfiles.list_sql_files(str(tmp_path))
+    assert files == [str(tmp_path / 'store.vwClients.sql')]
+
+
+def test_read_sql_files_should_leave_out_unreadable_files(tmp_path):
+    (tmp_path / 'store.vwClients.sql').write_bytes(b'SELECT 1')
+    files = [str(tmp_path / 'store.vwClients.sql'), str(tmp_path / 'store.vwMissing.sql')]
+    file_contents = sqlfiles.read_sql_files(files)
+    assert file_contents == {str(tmp_path / 'store.vwClients.sql'): b'SELECT 1'}
+
+
+def test_dependency_levels_should_order_files_by_references():
+    sql_by_file = {
+        'store.vwProductClients.sql': 'CREATE VIEW store.vwProductClients AS SELECT * FROM [store].[vwClients] JOIN store.vwProducts ON 1=1',
+        'store.vwClients.sql': 'CREATE VIEW [store].[vwClients] AS SELECT * FROM store.Clients',
+        'store.vwProducts.sql': 'CREATE VIEW store.vwProducts AS SELECT * FROM store.Products'
+    }
+    levels = sqlfiles.dependency_levels(sql_by_file)
+    assert levels == [
+        ['store.vwClients.sql', 'store.vwProducts.sql'],
+        ['store.vwProductClients.sql']
+    ]
+
+
+def test_dependency_levels_should_put_circular_dependencies_last():
+    sql_by_file = {
+        'store.a.sql': 'CREATE VIEW store.a AS SELECT * FROM store.b',
+        'store.b.sql': 'CREATE VIEW store.b AS SELECT * FROM store.a',
+        'store.c.sql': 'CREATE VIEW store.c AS SELECT 1 AS one'
+    }
+    levels = sqlfiles.dependency_levels(sql_by_file)
+    assert levels == [['store.c.sql'], ['store.a.sql', 'store.b.sql']]
+
+
+def test_parallel_file_loop_should_execute_levels_in_order():
+    executed = []
+
+    def command(file):
+        if file == 'c.sql' and not {'a.sql', 'b.sql'} <= set(executed):
+            raise RuntimeError('a.sql and b.sql must be executed first')
+        executed.append(file)
+
+    levels = [['a.sql', 'b.sql'], ['c.sql']]
+    failed = sqlfiles.parallel_file_loop(command, levels=levels, max_workers=2)
+    assert failed == []
+    assert executed[-1] == 'c.sql'
+
+
+def test_parallel_file_loop_should_return_failed_files():
+    def command(file):
+        if file == 'b.sql':
+            raise RuntimeError('Always fails')
+
+    failed = sqlfiles.parallel_file_loop(command, levels=[['a.sql', 'b.sql']], max_workers=2)
+    assert failed == ['b.sql']
+
+
+def test_parallel_file_loop_should_log_errors(caplog):
+    def command(file):
+        raise RuntimeError('Deadlock victim')
+
+    caplog.set_level(logging.DEBUG, logger='ahjo')
+    sqlfiles.parallel_file_loop(command, levels=[['a.sql']], max_workers=2)
+    assert 'a.sql' in caplog.text
+    assert 'RuntimeError: Deadlock victim' in caplog.text
+
+
+def test_object_name_from_file_should_return_schema_and_object():
+    assert sqlfiles.object_name_from_file('./database/views/store.vwClients.sql', 'VIEW') == 'store.vwClients'
+    assert sqlfiles.object_name_from_file('./database/assemblies/Utils.sql', 'ASSEMBLY') == 'Utils'
+
+
+def test_object_name_from_file_should_raise_error_if_not_schema_object_sql():
+    with pytest.raises(RuntimeError):
+        sqlfiles.object_name_from_file('./database/views/vwClients.sql', 'VIEW')
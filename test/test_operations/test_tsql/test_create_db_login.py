@@ -0,0 +1,59 @@
+import ahjo.operations.tsql.create_db_login as cdl
+import pytest
+from ahjo.database_utilities import execute_query
+from sqlalchemy import create_engine
+from sqlalchemy.engine.url import URL
+from sqlalchemy.pool import NullPool
+
+# characters that must be quoted in login name and password
+LOGIN_NAME = 'ahjo_test]login'
+LOGIN_PASSWORD = "ahjo'test]password"
+
+
+@pytest.mark.mssql
+class TestWithSQLServer():
+
+    @pytest.fixture(scope='function', autouse=True)
+    def create_db_login_setup_and_teardown(self, ahjo_config, mssql_sample, mssql_master_engine, test_db_name):
+        self.config = ahjo_config(mssql_sample)
+        self.engine = mssql_master_engine
+        self.default_db = test_db_name
+        yield
+        execute_query(self.engine, cdl.QUERIES.get('kill_login_sessions'), variables=[LOGIN_NAME])
+        if execute_query(self.engine, cdl.QUERIES.get('get_login_name'), variables=[LOGIN_NAME]):
+            execute_query(self.engine, cdl.QUERIES.get('drop_login'), variables=[LOGIN_NAME])
+
+    def login_engine(self):
+        """Create engine that connects with the created login, without pooling connections."""
+        connection_url = URL(
+            drivername="mssql+pyodbc",
+            username=LOGIN_NAME,
+            password=LOGIN_PASSWORD,
+            host=self.config['target_server_hostname'],
+            port=self.config['sql_port'],
+            database=self.default_db,
+            query={'driver': self.config['sql_driver']}
+        )
+        return create_engine(connection_url, poolclass=NullPool)
+
+    def test_created_login_should_connect_to_default_database(self):
+        cdl.create_db_login(self.engine, LOGIN_NAME, LOGIN_PASSWORD, self.default_db)
+        with self.login_engine().connect() as conn:
+            assert conn.execute("SELECT SUSER_SNAME()").scalar() == LOGIN_NAME
+            assert conn.execute("SELECT DB_NAME()").scalar() == self.default_db
+
+    def test_create_db_login_should_recreate_login_with_open_session(self):
+        cdl.create_db_login(self.engine, LOGIN_NAME, LOGIN_PASSWORD, self.default_db)
+        login_engine = self.login_engine()
+        conn = login_engine.connect()
+        try:
+            assert conn.execute("SELECT SUSER_SNAME()").scalar() == LOGIN_NAME
+            # open session is killed and existing login dropped before create
+            cdl.create_db_login(self.engine, LOGIN_NAME, LOGIN_PASSWORD, self.default_db)
+        finally:
+            try:
+                conn.close()
+            except Exception:
+                pass    # session was killed
+        with login_engine.connect() as conn:
+            assert conn.execute("SELECT SUSER_SNAME()").scalar() == LOGIN_NAME
@@ -1,6 +1,5 @@
 import json
 import logging
-from os import chdir, getcwd
 
 import ahjo.operations.tsql.db_object_properties as dop
 import pytest
@@ -39,15 +38,13 @@ FLAG_QUERY = """
 class TestWithSQLServer():
 
     @pytest.fixture(scope='function', autouse=True)
-    def db_objects_setup_and_teardown(self, mssql_sample, mssql_engine, run_alembic_action):
+    def db_objects_setup_and_teardown(self, monkeypatch, mssql_sample, mssql_engine, run_alembic_action):
         """Deploy objects without updating object properties and git version."""
         self.engine = mssql_engine
-        old_cwd = getcwd()
-        chdir(mssql_sample)
+        monkeypatch.chdir(mssql_sample)
         run_alembic_action('upgrade', 'head')
         yield
         run_alembic_action('downgrade', 'base')
-        chdir(old_cwd)
 
     def test_objects_should_not_have_external_properties_before_update(self):
         result = self.engine.execute(DESC_QUERY)